@@ -18,24 +18,33 @@ PathType = Union[str, Path]
 NumpyArray = Union[np.array, np.memmap]
 DtypeType = Union[str, np.dtype]
 IntType = Union[int, np.integer]
-FloatType = Union[float, np.float]
+FloatType = Union[float, np.floating]
 
 
 def dict_recursive_update(base, input_):
-    for key, val in input_.items():
-        if key in base and isinstance(val, dict) and isinstance(base[key], dict):
-            dict_recursive_update(base[key], val)
-        elif key in base and isinstance(val, list) and isinstance(base[key], list):
-            for i, input_list_item in enumerate(val):
-                if len(base[key]) < i:
-                    if isinstance(base[key][i], dict) and isinstance(input_list_item, dict):
-                        dict_recursive_update(base[key][i], input_list_item)
+    """
+    Updates 'base' in place with 'input_': nested dicts are merged, list items
+    are merged position by position (extra items are appended) and any other
+    value is overwritten.
+    """
+    to_merge = [(base, input_)]
+    while to_merge:
+        base_dict, input_dict = to_merge.pop()
+        for key, val in input_dict.items():
+            base_val = base_dict.get(key)
+            if isinstance(val, dict) and isinstance(base_val, dict):
+                to_merge.append((base_val, val))
+            elif isinstance(val, list) and isinstance(base_val, list):
+                for i, input_list_item in enumerate(val):
+                    if i < len(base_val):
+                        if isinstance(base_val[i], dict) and isinstance(input_list_item, dict):
+                            to_merge.append((base_val[i], input_list_item))
+                        else:
+                            base_val[i] = input_list_item
                     else:
-                        base[key][i] = input_list_item
-                else:
-                    base[key].append(input_list_item)
-        else:
-            base[key] = val
+                        base_val.append(input_list_item)
+            else:
+                base_dict[key] = val
     return base
 
 
@@ -47,13 +56,13 @@ def _pixel_mask_extractor(image_mask_, _roi_ids):
         Total pixels X 4 size. Col 1 and 2 are x and y location of the mask
         pixel, Col 3 is the weight of that pixel, Col 4 is the ROI index.
     """
-    pixel_mask_list = []
-    for i, roiid in enumerate(_roi_ids):
-        image_mask = np.array(image_mask_[:, :, i])
-        _locs = np.where(image_mask > 0)
-        _pix_values = image_mask[image_mask > 0]
-        pixel_mask_list.append(np.vstack((_locs[0], _locs[1], _pix_values)).T)
-    return pixel_mask_list
+    if len(_roi_ids) == 0:
+        return []
+    # roi axis first, so that the nonzero pixels come out grouped by roi:
+    image_masks = np.moveaxis(np.asarray(image_mask_)[:, :, :len(_roi_ids)], -1, 0)
+    roi_idx, x_locs, y_locs = np.nonzero(image_masks > 0)
+    pixel_masks = np.column_stack((x_locs, y_locs, image_masks[roi_idx, x_locs, y_locs]))
+    return np.split(pixel_masks, np.searchsorted(roi_idx, np.arange(1, len(_roi_ids))))
 
 
 def _image_mask_extractor(pixel_mask, _roi_ids, image_shape):
@@ -72,12 +81,28 @@ def _image_mask_extractor(pixel_mask, _roi_ids, image_shape):
     image_mask: np.ndarray
     """
     image_mask = np.zeros(list(image_shape) + [len(_roi_ids)])
-    for no, rois in enumerate(_roi_ids):
-        for x, y, wt in pixel_mask[rois]:
-            image_mask[int(x), int(y), no] = wt
+    roi_pixel_masks = [np.asarray(pixel_mask[rois]).reshape(-1, 3) for rois in _roi_ids]
+    if len(roi_pixel_masks) == 0:
+        return image_mask
+    pixels = np.concatenate(roi_pixel_masks)
+    roi_no = np.repeat(np.arange(len(_roi_ids)), [len(roi_pixels) for roi_pixels in roi_pixel_masks])
+    image_mask[pixels[:, 0].astype(int), pixels[:, 1].astype(int), roi_no] = pixels[:, 2]
     return image_mask
 
 
+def _is_strictly_increasing(idxs, block_size=65536):
+    """
+    Checks if a 1D array of indices is strictly increasing. The check runs block
+    by block and stops at the first unsorted block, so no array of the size of
+    'idxs' is allocated.
+    """
+    for start in range(0, idxs.size - 1, block_size):
+        block = idxs[start:start + block_size + 1]
+        if not np.all(block[1:] > block[:-1]):
+            return False
+    return True
+
+
 def get_video_shape(video):
     if len(video.shape) == 3:
         # 1 channel
@@ -50,7 +50,8 @@ class CaimanSegmentationExtractor(SegmentationExtractor):
         masks = self._dataset_file['estimates']['A']['data']
         ids = self._dataset_file['estimates']['A']['indptr']
         image_mask_in = csc_matrix((masks, roi_ids, ids),
-                                   shape=(np.prod(self.get_image_size()), self.get_num_rois())).toarray()
+                                   shape=(np.prod(self.get_image_size()), self.get_num_rois())).toarray(order='F')
+        # a view: the Fortran-ordered dense array reshapes without a copy
         image_masks = np.reshape(image_mask_in, (*self.get_image_size(), -1), order='F')
         return image_masks
 
@@ -110,9 +111,14 @@ class CaimanSegmentationExtractor(SegmentationExtractor):
             estimates.create_dataset('idx_components_bad', data=np.array(segmentation_object.get_rejected_list()))
 
             # adding image_masks:
-            image_mask_data = np.reshape(segmentation_object.get_roi_image_masks(),
-                                         [-1, segmentation_object.get_num_rois()], order='F')
-            image_mask_csc = csc_matrix(image_mask_data)
+            # built from the nonzero pixels with Fortran-order pixel indices, instead of a dense
+            # Fortran-order copy of all the masks:
+            image_masks = segmentation_object.get_roi_image_masks()
+            height, width, num_rois = image_masks.shape
+            y_locs, x_locs, roi_idx = np.nonzero(image_masks)
+            image_mask_csc = csc_matrix((image_masks[y_locs, x_locs, roi_idx], (y_locs + height * x_locs, roi_idx)),
+                                        shape=(height * width, num_rois))
+            image_mask_csc.sort_indices()
             estimates.create_dataset('A/data', data=image_mask_csc.data)
             estimates.create_dataset('A/indptr', data=image_mask_csc.indptr)
             estimates.create_dataset('A/indices', data=image_mask_csc.indices)
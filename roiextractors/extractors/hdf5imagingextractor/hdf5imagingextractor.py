@@ -3,7 +3,8 @@ from pathlib import Path
 import numpy as np
 
 from ...extraction_tools import PathType, FloatType, ArrayType
-from ...extraction_tools import check_get_frames_args, get_video_shape, write_to_h5_dataset_format
+from ...extraction_tools import check_get_frames_args, get_video_shape, write_to_h5_dataset_format, \
+    _is_strictly_increasing
 from ...imagingextractor import ImagingExtractor
 
 try:
@@ -75,7 +76,7 @@ class Hdf5ImagingExtractor(ImagingExtractor):
 
     @check_get_frames_args
     def get_frames(self, frame_idxs, channel=0):
-        if frame_idxs.size > 1 and np.all(np.diff(frame_idxs) > 0) or frame_idxs.size == 1:
+        if frame_idxs.size > 1 and _is_strictly_increasing(frame_idxs) or frame_idxs.size == 1:
             return self._video[channel, frame_idxs]
             # return lazy_ops.DatasetView(self._video).lazy_slice[channel, frame_idxs]
         else:
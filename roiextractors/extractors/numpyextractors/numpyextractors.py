@@ -227,20 +227,15 @@ class NumpySegmentationExtractor(SegmentationExtractor):
 
     def get_rejected_list(self):
         if self._rejected_list is None:
-            return [a for a in range(self.get_num_rois()) if a not in set(self.get_accepted_list())]
+            accepted_set = set(self.get_accepted_list())
+            return [a for a in range(self.get_num_rois()) if a not in accepted_set]
         else:
             return self._rejected_list
 
     @property
     def roi_locations(self):
         if self._roi_locs is None:
-            num_ROIs = self.get_num_rois()
-            raw_images = self.image_masks
-            roi_location = np.ndarray([2, num_ROIs], dtype='int')
-            for i in range(num_ROIs):
-                temp = np.where(raw_images[:, :, i] == np.amax(raw_images[:, :, i]))
-                roi_location[:, i] = np.array([np.median(temp[0]), np.median(temp[1])]).T
-            return roi_location
+            return super().roi_locations
         else:
             return self._roi_locs
 
@@ -9,19 +9,22 @@ import numpy as np
 from lazy_ops import DatasetView
 
 from ...extraction_tools import FloatType, IntType, \
-    check_get_frames_args, check_get_videos_args, dict_recursive_update
+    check_get_frames_args, check_get_videos_args, dict_recursive_update, _is_strictly_increasing
 from ...extraction_tools import PathType
 from ...imagingextractor import ImagingExtractor
 from ...multisegmentationextractor import MultiSegmentationExtractor
 from ...segmentationextractor import SegmentationExtractor
 
 try:
+    import h5py
     from pynwb import NWBHDF5IO, TimeSeries, NWBFile
     from pynwb.base import Images
     from pynwb.image import GrayscaleImage
-    from pynwb.ophys import ImageSegmentation, Fluorescence, OpticalChannel, TwoPhotonSeries, DfOverF
+    from pynwb.ophys import ImageSegmentation, Fluorescence, OpticalChannel, TwoPhotonSeries, DfOverF, \
+        RoiResponseSeries
     from pynwb.file import Subject
     from pynwb.device import Device
+    from hdmf.common import VectorData
     from hdmf.data_utils import DataChunkIterator
     from hdmf.backends.hdf5.h5_utils import H5DataIO
 
@@ -29,17 +32,71 @@ try:
 except ModuleNotFoundError:
     HAVE_NWB = False
 
+try:
+    import fsspec
+
+    HAVE_FSSPEC = True
+except ModuleNotFoundError:
+    HAVE_FSSPEC = False
+
+try:
+    import hdf5plugin
+
+    HAVE_HDF5PLUGIN = True
+except ModuleNotFoundError:
+    HAVE_HDF5PLUGIN = False
+
+REMOTE_PATH_PREFIXES = ('http://', 'https://', 's3://')
+
 
 def check_nwb_install():
     assert HAVE_NWB, "To use the Nwb extractors, install pynwb: \n\n pip install pynwb\n\n"
 
 
+def open_nwb_read_io(file_path: PathType, rdcc_nbytes: int = 64 * 1024 ** 2, rdcc_nslots: int = 521):
+    """
+    Opens an nwb file for reading through an h5py.File with a tuned chunk cache.
+    Remote files (http(s)://, s3://) are read through an fsspec block cache, so
+    that small reads do not each turn into a separate request.
+
+    Parameters
+    ----------
+    file_path: PathType
+        local path or url of the .nwb file
+    rdcc_nbytes: int
+        size in bytes of the HDF5 raw data chunk cache
+    rdcc_nslots: int
+        number of slots of the HDF5 raw data chunk cache
+
+    Returns
+    -------
+    io: NWBHDF5IO
+        io object to read the nwbfile from
+    file_handles: list
+        the underlying file objects, to be closed after 'io'
+    """
+    check_nwb_install()
+    file_path = str(file_path)
+    file_handles = []
+    if file_path.startswith(REMOTE_PATH_PREFIXES):
+        assert HAVE_FSSPEC, "To read remote nwb files, install fsspec: \n\n pip install fsspec\n\n"
+        remote_file = fsspec.open(file_path, mode='rb', cache_type='mmap', block_size=8 * 1024 ** 2).open()
+        file_handles.append(remote_file)
+        h5_file = h5py.File(remote_file, 'r', rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots)
+    else:
+        h5_file = h5py.File(file_path, 'r', rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots)
+    file_handles.insert(0, h5_file)
+    io = NWBHDF5IO(h5_file.filename, mode='r', file=h5_file)
+    return io, file_handles
+
+
 def set_dynamic_table_property(dynamic_table, ids, row_ids, property_name, values, index=False,
                                default_value=np.nan, description='no description'):
     check_nwb_install()
     if not isinstance(row_ids, list) or not all(isinstance(x, int) for x in row_ids):
         raise TypeError("'ids' must be a list of integers")
-    if any([i not in ids for i in row_ids]):
+    id_to_pos = {row_id: pos for pos, row_id in enumerate(ids)}
+    if any([i not in id_to_pos for i in row_ids]):
         raise ValueError("'ids' contains values outside the range of existing ids")
     if not isinstance(property_name, str):
         raise TypeError("'property_name' must be a string")
@@ -49,11 +106,11 @@ def set_dynamic_table_property(dynamic_table, ids, row_ids, property_name, value
     if index is False:
         if property_name in dynamic_table:
             for (row_id, value) in zip(row_ids, values):
-                dynamic_table[property_name].data[ids.index(row_id)] = value
+                dynamic_table[property_name].data[id_to_pos[row_id]] = value
         else:
             col_data = [default_value] * len(ids)  # init with default val
             for (row_id, value) in zip(row_ids, values):
-                col_data[ids.index(row_id)] = value
+                col_data[id_to_pos[row_id]] = value
             dynamic_table.add_column(
                 name=property_name,
                 description=description,
@@ -76,7 +133,8 @@ def get_dynamic_table_property(dynamic_table, *, row_ids=None, property_name):
     all_row_ids = list(dynamic_table.id[:])
     if row_ids is None:
         row_ids = all_row_ids
-    return [dynamic_table[property_name][all_row_ids.index(x)] for x in row_ids]
+    id_to_pos = {row_id: pos for pos, row_id in enumerate(all_row_ids)}
+    return [dynamic_table[property_name][id_to_pos[x]] for x in row_ids]
 
 
 def update_dict(d, u):
@@ -88,6 +146,60 @@ def update_dict(d, u):
     return d
 
 
+def _read_frames_by_chunk(dataset, frame_idxs):
+    """
+    Reads arbitrary frames from a chunked h5py dataset, reading every touched
+    chunk along the frame axis only once.
+
+    Parameters
+    ----------
+    dataset: h5py.Dataset
+        chunked dataset with frames along the first axis
+    frame_idxs: np.ndarray
+        frame indices to read, in any order
+
+    Returns
+    -------
+    frames: np.ndarray
+        the requested frames, in the order of frame_idxs
+    """
+    order = np.argsort(frame_idxs, kind='stable')
+    sorted_idxs = frame_idxs[order]
+    frame_shape = dataset.shape[1:]
+    frames = np.empty((len(frame_idxs), *frame_shape), dtype=dataset.dtype)
+    _, group_starts = np.unique(sorted_idxs // dataset.chunks[0], return_index=True)
+    group_ends = np.append(group_starts[1:], len(sorted_idxs))
+    for group_start, group_end in zip(group_starts, group_ends):
+        lo, hi = sorted_idxs[group_start], sorted_idxs[group_end - 1] + 1
+        block = np.empty((hi - lo, *frame_shape), dtype=dataset.dtype)
+        dataset.read_direct(block, np.s_[lo:hi], np.s_[:])
+        frames[order[group_start:group_end]] = block[sorted_idxs[group_start:group_end] - lo]
+    return frames
+
+
+def _get_image_mask_dataio(image_masks):
+    """
+    Wraps the image_mask column data for writing: chunks of whole masks of ~1MB,
+    bitshuffle compressed when hdf5plugin is installed, lzf compressed otherwise.
+
+    Parameters
+    ----------
+    image_masks: np.ndarray
+        image masks of all the rois, roi axis first: (num_rois, height, width)
+
+    Returns
+    -------
+    dataio: H5DataIO
+    """
+    num_rois, height, width = image_masks.shape
+    rois_per_chunk = max(1, 1000000 // (height * width * image_masks.dtype.itemsize))
+    chunks = (max(1, min(rois_per_chunk, num_rois)), height, width)
+    if HAVE_HDF5PLUGIN:
+        return H5DataIO(image_masks, chunks=chunks, compression=hdf5plugin.BSHUF_ID, compression_opts=(0, 2),
+                        allow_plugin_filters=True)
+    return H5DataIO(image_masks, chunks=chunks, compression='lzf')
+
+
 def get_default_nwb_metadata():
     metadata = {'NWBFile': {'session_start_time': datetime.now(),
                             'identifier': str(uuid.uuid4()),
@@ -123,20 +235,25 @@ class NwbImagingExtractor(ImagingExtractor):
     mode = 'file'
     installation_mesg = "To use the Nwb Extractor run:\n\n pip install pynwb\n\n"  # error message when not installed
 
-    def __init__(self, file_path: PathType, optical_series_name: str = 'TwoPhotonSeries'):
+    def __init__(self, file_path: PathType, optical_series_name: str = 'TwoPhotonSeries',
+                 rdcc_nbytes: int = 64 * 1024 ** 2, rdcc_nslots: int = 521):
         """
         Parameters
         ----------
         file_path: str
-            The location of the folder containing dataset.nwb file
+            The location of the folder containing dataset.nwb file, or its url
         optical_series_name: str (optional)
             optical series to extract data from
+        rdcc_nbytes: int (optional)
+            size in bytes of the HDF5 chunk cache (default 64 MiB)
+        rdcc_nslots: int (optional)
+            number of slots of the HDF5 chunk cache
         """
         assert HAVE_NWB, self.installation_mesg
         ImagingExtractor.__init__(self)
         self._path = file_path
 
-        self.io = NWBHDF5IO(self._path, 'r')
+        self.io, self._file_handles = open_nwb_read_io(self._path, rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots)
         self.nwbfile = self.io.read()
         if optical_series_name is not None:
             self._optical_series_name = optical_series_name
@@ -153,6 +270,8 @@ class NwbImagingExtractor(ImagingExtractor):
 
         # TODO if external file --> return another proper extractor (e.g. TiffImagingExtractor)
         assert opts.external_file is None, "Only 'raw' format is currently supported"
+        self._opts = opts
+        self._data = opts.data
 
         if hasattr(opts, 'timestamps') and opts.timestamps:
             self._sampling_frequency = 1. / np.median(np.diff(opts.timestamps))
@@ -173,22 +292,33 @@ class NwbImagingExtractor(ImagingExtractor):
         if self.nwbfile.epochs is not None:
             df_epochs = self.nwbfile.epochs.to_dataframe()
             # TODO implement add_epoch() method in base class
-            self._epochs = {row['tags'][0]: {
-                'start_frame': self.time_to_frame(row['start_time']),
-                'end_frame': self.time_to_frame(row['stop_time'])}
-                for _, row in df_epochs.iterrows()}
-
-        self._kwargs = {'file_path': str(Path(file_path).absolute()),
-                        'optical_series_name': optical_series_name}
+            start_frames = self.time_to_frame(df_epochs['start_time'].values)
+            end_frames = self.time_to_frame(df_epochs['stop_time'].values)
+            self._epochs = {tag: {'start_frame': int(start_frame), 'end_frame': int(end_frame)}
+                            for tag, start_frame, end_frame in zip(df_epochs['tags'].str[0].values,
+                                                                   start_frames, end_frames)}
+
+        if str(file_path).startswith(REMOTE_PATH_PREFIXES):
+            file_path = str(file_path)
+        else:
+            file_path = str(Path(file_path).absolute())
+        self._kwargs = {'file_path': file_path,
+                        'optical_series_name': optical_series_name,
+                        'rdcc_nbytes': rdcc_nbytes,
+                        'rdcc_nslots': rdcc_nslots}
 
     def __del__(self):
         self.io.close()
+        for file_handle in self._file_handles:
+            file_handle.close()
 
     def time_to_frame(self, time: FloatType):
-        return int((time - self._imaging_start_time) * self.get_sampling_frequency())
+        frames = ((np.asarray(time) - self._imaging_start_time) * self.get_sampling_frequency()).astype(int)
+        return frames if frames.ndim else int(frames)
 
     def frame_to_time(self, frame: IntType):
-        return float(frame / self.get_sampling_frequency() + self._imaging_start_time)
+        times = (np.asarray(frame) / self.get_sampling_frequency() + self._imaging_start_time).astype(float)
+        return times if times.ndim else float(times)
 
     def make_nwb_metadata(self, nwbfile, opts):
         # Metadata dictionary - useful for constructing a nwb file
@@ -215,18 +345,24 @@ class NwbImagingExtractor(ImagingExtractor):
     # TODO use lazy_ops
     @check_get_frames_args
     def get_frames(self, frame_idxs, channel=0):
-        opts = self.nwbfile.acquisition[self._optical_series_name]
-        if frame_idxs.size > 1 and np.all(np.diff(frame_idxs) > 0):
-            return opts.data[frame_idxs]
+        if isinstance(self._data, h5py.Dataset) and self._data.chunks is not None \
+                and not isinstance(frame_idxs, slice):
+            return _read_frames_by_chunk(self._data, frame_idxs)
+        if frame_idxs.size > 1 and _is_strictly_increasing(frame_idxs):
+            return self._data[frame_idxs]
         else:
             sorted_idxs = np.sort(frame_idxs)
             argsorted_idxs = np.argsort(frame_idxs)
-            return opts.data[sorted_idxs][argsorted_idxs]
+            return self._data[sorted_idxs][argsorted_idxs]
 
     @check_get_videos_args
     def get_video(self, start_frame=None, end_frame=None, channel=0):
-        opts = self.nwbfile.acquisition[self._optical_series_name]
-        video = opts.data[start_frame:end_frame]
+        if isinstance(self._data, h5py.Dataset):
+            # read straight into a preallocated buffer, bypassing h5py's slicing machinery
+            video = np.empty((end_frame - start_frame, self._size_x, self._size_y), dtype=self._data.dtype)
+            self._data.read_direct(video, np.s_[start_frame:end_frame], np.s_[:])
+        else:
+            video = self._data[start_frame:end_frame]
         return video
 
     def get_image_size(self):
@@ -284,12 +420,11 @@ class NwbImagingExtractor(ImagingExtractor):
         if 'TwoPthotonSeries' not in metadata['Ophys']:
             metadata['Ophys']['TwoPhotonSeries'] = [{'name': 'TwoPhotonSeries',
                                                      'description': 'optical_series_description'}]
-        # Tests if ElectricalSeries already exists in acquisition
-        nwb_es_names = [ac for ac in nwbfile.acquisition]
+        # Tests if TwoPhotonSeries already exists in acquisition
         opts = metadata['Ophys']['TwoPhotonSeries'][0]
-        if opts['name'] not in nwb_es_names:
+        if opts['name'] not in nwbfile.acquisition:
             # retrieve device
-            device = nwbfile.devices[list(nwbfile.devices.keys())[0]]
+            device = nwbfile.devices[next(iter(nwbfile.devices))]
 
             # create optical channel
             if 'OpticalChannel' not in metadata['Ophys']:
@@ -314,19 +449,28 @@ class NwbImagingExtractor(ImagingExtractor):
 
             imaging_plane = nwbfile.create_imaging_plane(**metadata['Ophys']['ImagingPlane'][0])
 
+            num_frames = imaging.get_num_frames()
+            size_x, size_y = imaging.get_image_size()
+            dtype = np.dtype(imaging.get_dtype())
+            # HDF5 chunks of ~1MB along the frame axis
+            chunk_frames = min(max(1, 1000000 // (size_x * size_y * dtype.itemsize)), num_frames)
+
             def data_generator(imaging, num_chunks):
-                num_frames = imaging.get_num_frames()
-                # chunk size is not None
-                chunk_size = num_frames // num_chunks
-                if num_frames % chunk_size > 0:
-                    num_chunks += 1
-                for i in range(num_chunks):
-                    video = imaging.get_video(start_frame=i * chunk_size,
-                                              end_frame=min((i + 1) * chunk_size, num_frames))
-                    data = np.squeeze(video)
-                    yield data
-
-            data = H5DataIO(DataChunkIterator(data_generator(imaging, num_chunks)), compression=True)
+                # read the video in slabs of at most one HDF5 chunk (fewer frames if 'num_chunks'
+                # asks for smaller slabs) and hand it over frame by frame, so peak memory stays ~1MB
+                slab_size = max(1, min(int(np.ceil(num_frames / num_chunks)), chunk_frames))
+                for start_frame in range(0, num_frames, slab_size):
+                    video = imaging.get_video(start_frame=start_frame,
+                                              end_frame=min(start_frame + slab_size, num_frames))
+                    # a single frame slab comes back as a 2D image
+                    video = np.reshape(video, (-1, size_x, size_y))
+                    for frame in video:
+                        yield frame
+
+            data = H5DataIO(DataChunkIterator(data=data_generator(imaging, num_chunks),
+                                              maxshape=(num_frames, size_x, size_y),
+                                              dtype=dtype, buffer_size=chunk_frames),
+                            chunks=(chunk_frames, size_x, size_y), compression='gzip')
             acquisition_name = opts['name']
 
             # using internal data. this data will be stored inside the NWB file
@@ -350,25 +494,23 @@ class NwbImagingExtractor(ImagingExtractor):
         Auxiliary static method for nwbextractor.
         Adds epochs from recording object to nwbfile object.
         """
+        # read the existing tags once
+        existing_tags = nwbfile.epochs['tags'][:] if nwbfile.epochs is not None else []
+        tag_to_ind = {tuple(tags): ind for ind, tags in enumerate(existing_tags)}
         # add/update epochs
         for (name, ep) in imaging._epochs.items():
-            if nwbfile.epochs is None:
+            start_time = imaging.frame_to_time(ep['start_frame'])
+            stop_time = imaging.frame_to_time(ep['end_frame'])
+            ind = tag_to_ind.get((name,))
+            if ind is None:
                 nwbfile.add_epoch(
-                    start_time=imaging.frame_to_time(ep['start_frame']),
-                    stop_time=imaging.frame_to_time(ep['end_frame']),
+                    start_time=start_time,
+                    stop_time=stop_time,
                     tags=name
                 )
             else:
-                if [name] in nwbfile.epochs['tags'][:]:
-                    ind = nwbfile.epochs['tags'][:].index([name])
-                    nwbfile.epochs['start_time'].data[ind] = imaging.frame_to_time(ep['start_frame'])
-                    nwbfile.epochs['stop_time'].data[ind] = imaging.frame_to_time(ep['end_frame'])
-                else:
-                    nwbfile.add_epoch(
-                        start_time=imaging.frame_to_time(ep['start_frame']),
-                        stop_time=imaging.frame_to_time(ep['end_frame']),
-                        tags=name
-                    )
+                nwbfile.epochs['start_time'].data[ind] = start_time
+                nwbfile.epochs['stop_time'].data[ind] = stop_time
 
         return nwbfile
 
@@ -417,17 +559,13 @@ class NwbImagingExtractor(ImagingExtractor):
             save_path = Path(save_path)
             assert save_path.suffix == '.nwb', "'save_path' file is not an .nwb file"
 
-            if save_path.is_file():
-                if not overwrite:
-                    read_mode = 'r+'
-                else:
-                    save_path.unlink()
-                    read_mode = 'w'
-            else:
-                read_mode = 'w'
+            nwbfile_exists = save_path.is_file()
+            if overwrite and nwbfile_exists:
+                save_path.unlink()
+                nwbfile_exists = False
 
-            with NWBHDF5IO(str(save_path), mode=read_mode) as io:
-                if read_mode == 'r+':
+            with NWBHDF5IO(str(save_path), mode='r+' if nwbfile_exists else 'w') as io:
+                if nwbfile_exists:
                     nwbfile = io.read()
                 else:
                     # Default arguments will be over-written if contained in metadata
@@ -472,17 +610,21 @@ class NwbSegmentationExtractor(SegmentationExtractor):
     mode = 'file'
     installation_mesg = ""  # error message when not installed
 
-    def __init__(self, file_path: PathType):
+    def __init__(self, file_path: PathType, rdcc_nbytes: int = 64 * 1024 ** 2, rdcc_nslots: int = 521):
         """
         Creating NwbSegmentationExtractor object from nwb file
         Parameters
         ----------
         file_path: str
-            .nwb file location
+            .nwb file location or url
+        rdcc_nbytes: int
+            size in bytes of the HDF5 chunk cache (default 64 MiB)
+        rdcc_nslots: int
+            number of slots of the HDF5 chunk cache
         """
         check_nwb_install()
         SegmentationExtractor.__init__(self)
-        if not os.path.exists(file_path):
+        if not str(file_path).startswith(REMOTE_PATH_PREFIXES) and not os.path.exists(file_path):
             raise Exception('file does not exist')
 
         self.file_path = file_path
@@ -490,79 +632,98 @@ class NwbSegmentationExtractor(SegmentationExtractor):
         self._roi_locs = None
         self._accepted_list = None
         self._rejected_list = None
-        self._io = NWBHDF5IO(file_path, mode='r')
+        self._accepted_ids = None
+        self._rejected_ids = None
+        self._image_datasets = {}
+        self._io, self._file_handles = open_nwb_read_io(file_path, rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots)
         self.nwbfile = self._io.read()
 
         ophys = self.nwbfile.processing.get('ophys')
         if ophys is None:
             raise Exception('could not find ophys processing module in nwbfile')
         else:
+            data_interfaces = ophys.data_interfaces
             # Extract roi_response:
-            fluorescence = None
-            dfof = None
             any_roi_response_series_found = False
-            if 'Fluorescence' in ophys.data_interfaces:
-                fluorescence = ophys.data_interfaces['Fluorescence']
-            if 'DfOverF' in ophys.data_interfaces:
-                dfof = ophys.data_interfaces['DfOverF']
+            fluorescence = data_interfaces.get('Fluorescence')
+            dfof = data_interfaces.get('DfOverF')
             if fluorescence is None and dfof is None:
                 raise Exception('could not find Fluorescence/DfOverF module in nwbfile')
             for trace_name in ['RoiResponseSeries', 'Dff', 'Neuropil', 'Deconvolved']:
                 trace_name_segext = 'raw' if trace_name == 'RoiResponseSeries' else trace_name.lower()
                 container = dfof if trace_name == 'Dff' else fluorescence
-                if container is not None and trace_name in container.roi_response_series:
+                roi_response_series = None if container is None else container.roi_response_series.get(trace_name)
+                if roi_response_series is not None:
                     any_roi_response_series_found = True
                     setattr(self, f'_roi_response_{trace_name_segext}',
-                            DatasetView(container.roi_response_series[trace_name].data).lazy_transpose())
+                            DatasetView(roi_response_series.data).lazy_transpose())
                     if self._sampling_frequency is None:
-                        self._sampling_frequency = container.roi_response_series[trace_name].rate
+                        self._sampling_frequency = roi_response_series.rate
             if not any_roi_response_series_found:
                 raise Exception(
                     'could not find any of \'RoiResponseSeries\'/\'Dff\'/\'Neuropil\'/\'Deconvolved\' named RoiResponseSeries in nwbfile')
 
             # Extract image_mask/background:
-            if 'ImageSegmentation' in ophys.data_interfaces:
-                image_seg = ophys.data_interfaces['ImageSegmentation']
-                if 'PlaneSegmentation' in image_seg.plane_segmentations:  # this requirement in nwbfile is enforced
-                    ps = image_seg.plane_segmentations['PlaneSegmentation']
+            image_seg = data_interfaces.get('ImageSegmentation')
+            if image_seg is not None:
+                ps = image_seg.plane_segmentations.get('PlaneSegmentation')
+                if ps is not None:  # this requirement in nwbfile is enforced
                     if 'image_mask' in ps.colnames:
                         self.image_masks = DatasetView(ps['image_mask'].data).lazy_transpose([1, 2, 0])
                     else:
                         raise Exception('could not find any image_masks in nwbfile')
                     if 'RoiCentroid' in ps.colnames:
                         self._roi_locs = ps['RoiCentroid']
+                    # Accepted/Rejected columns are read on first use:
                     if 'Accepted' in ps.colnames:
-                        self._accepted_list = ps['Accepted'].data[:]
+                        self._accepted_list = ps['Accepted'].data
                     if 'Rejected' in ps.colnames:
-                        self._rejected_list = ps['Rejected'].data[:]
+                        self._rejected_list = ps['Rejected'].data
                     self._roi_idx = np.array(ps.id.data)
                 else:
                     raise Exception('could not find any PlaneSegmentation in nwbfile')
 
             # Extracting stores images as GrayscaleImages:
-            if 'SegmentationImages' in ophys.data_interfaces:
-                images_container = ophys.data_interfaces['SegmentationImages']
-                if 'correlation' in images_container.images:
-                    self._image_correlation = images_container.images['correlation'].data[()]
-                if 'mean' in images_container.images:
-                    self._image_mean = images_container.images['mean'].data[()]
+            images_container = data_interfaces.get('SegmentationImages')
+            if images_container is not None:
+                images = images_container.images
+                # images are read on first use:
+                for image_name in ['correlation', 'mean']:
+                    if image_name in images:
+                        self._image_datasets[image_name] = images[image_name].data
 
         # Imaging plane:
-        if 'ImagingPlane' in self.nwbfile.imaging_planes:
-            imaging_plane = self.nwbfile.imaging_planes['ImagingPlane']
+        imaging_plane = self.nwbfile.imaging_planes.get('ImagingPlane')
+        if imaging_plane is not None:
             self._channel_names = [i.name for i in imaging_plane.optical_channel]
 
     def __del__(self):
         self._io.close()
+        for file_handle in self._file_handles:
+            file_handle.close()
 
     def get_accepted_list(self):
-        if self._accepted_list is None:
-            return list(range(self.get_num_rois()))
-        else:
-            return np.where(self._accepted_list == 1)[0].tolist()
+        if self._accepted_ids is None:
+            if self._accepted_list is None:
+                self._accepted_ids = list(range(self.get_num_rois()))
+            else:
+                self._accepted_ids = np.where(self._accepted_list[:] == 1)[0].tolist()
+        return list(self._accepted_ids)
 
     def get_rejected_list(self):
-        return self._rejected_list
+        if self._rejected_ids is None:
+            if self._rejected_list is None:
+                accepted_set = set(self.get_accepted_list())
+                self._rejected_ids = [a for a in range(self.get_num_rois()) if a not in accepted_set]
+            else:
+                self._rejected_ids = np.where(self._rejected_list[:] == 1)[0].tolist()
+        return list(self._rejected_ids)
+
+    def get_images_dict(self):
+        for image_name, image_data in self._image_datasets.items():
+            setattr(self, f'_image_{image_name}', image_data[()])
+        self._image_datasets = {}
+        return super().get_images_dict()
 
     @property
     def roi_locations(self):
@@ -575,6 +736,11 @@ class NwbSegmentationExtractor(SegmentationExtractor):
     def get_image_size(self):
         return self.image_masks.shape[:2]
 
+    def get_roi_image_masks(self, roi_ids=None):
+        # binary masks are stored as uint8 by write_segmentation, they are returned as floats
+        # so that weights derived from them do not wrap around in unsigned arithmetic
+        return super().get_roi_image_masks(roi_ids=roi_ids).astype(float, copy=False)
+
     @staticmethod
     def get_nwb_metadata(sgmextractor):
         """
@@ -597,8 +763,8 @@ class NwbSegmentationExtractor(SegmentationExtractor):
                 ))
 
         # set roi_response_series rate:
-        rate = np.float(
-            'NaN') if sgmextractor.get_sampling_frequency() is None else sgmextractor.get_sampling_frequency()
+        sampling_frequency = sgmextractor.get_sampling_frequency()
+        rate = np.nan if sampling_frequency is None else sampling_frequency
         for trace_name, trace_data in sgmextractor.get_traces_dict().items():
             if trace_name == 'raw':
                 if trace_data is not None:
@@ -617,19 +783,43 @@ class NwbSegmentationExtractor(SegmentationExtractor):
         return metadata
 
     @staticmethod
-    def write_segmentation(segext_obj, save_path, plane_num=0, metadata=None, overwrite=True):
+    def write_segmentation(segext_obj, save_path, plane_num=0, metadata=None, overwrite=True,
+                           verify_after_write=False):
+        """
+        Parameters
+        ----------
+        segext_obj: SegmentationExtractor or MultiSegmentationExtractor
+            The segmentation extractor object(s) to be written to nwb
+        save_path: PathType
+            Path to the nwbfile; an existing file is appended to unless overwrite is True.
+        plane_num: int
+            Unused, kept for backwards compatibility
+        metadata: dict or list
+            metadata info for constructing the nwb file (optional). A list with one
+            dict per segmentation for a MultiSegmentationExtractor.
+        overwrite: bool
+            If True and save_path is existing, it is overwritten
+        verify_after_write: bool
+            If True, the written file is read back once more as a check. This re-reads
+            the whole file, so it is off by default (default False)
+
+        Notes
+        -----
+        Binary image masks are stored as uint8; NwbSegmentationExtractor.get_roi_image_masks
+        returns them as floats again.
+
+        The image masks are bitshuffle compressed if hdf5plugin is importable at write
+        time, and the resulting file then needs hdf5plugin to be read. Otherwise they
+        are lzf compressed, which h5py reads without extra plugins.
+        """
         save_path = Path(save_path)
         assert save_path.suffix == '.nwb'
-        if save_path.is_file() and not overwrite:
-            nwbfile_exist = True
-            file_mode = 'r+'
-        else:
-            if save_path.is_file():
-                os.remove(save_path)
-            if not save_path.parent.is_dir():
-                save_path.parent.mkdir(parents=True)
-            nwbfile_exist = False
-            file_mode = 'w'
+        nwbfile_exists = save_path.is_file()
+        if overwrite and nwbfile_exists:
+            save_path.unlink()
+            nwbfile_exists = False
+        if not save_path.parent.is_dir():
+            save_path.parent.mkdir(parents=True)
 
         # parse metadata correctly:
         if isinstance(segext_obj, MultiSegmentationExtractor):
@@ -652,9 +842,9 @@ class NwbSegmentationExtractor(SegmentationExtractor):
             metadata_input = metadata[num] if metadata else {}
             metadata_base_list[num] = dict_recursive_update(metadata_base_list[num], metadata_input)
         # loop for every plane:
-        with NWBHDF5IO(str(save_path), file_mode) as io:
+        with NWBHDF5IO(str(save_path), mode='r+' if nwbfile_exists else 'w') as io:
             metadata_base_common = metadata_base_list[0]
-            if nwbfile_exist:
+            if nwbfile_exists:
                 nwbfile = io.read()
             else:
                 nwbfile = NWBFile(**metadata_base_common['NWBFile'])
@@ -668,95 +858,112 @@ class NwbSegmentationExtractor(SegmentationExtractor):
                                                          'contains optical physiology processed data')
             else:
                 ophys = nwbfile.get_processing_module('ophys')
+            # bound once, these are live views that also reflect the containers added below:
+            data_interfaces = ophys.data_interfaces
+            devices = nwbfile.devices
+            imaging_planes = nwbfile.imaging_planes
 
             for plane_no_loop, (segext_obj, metadata) in enumerate(zip(segext_objs, metadata_base_list)):
+                device_metadata = metadata['Ophys']['Device'][0]
+                imaging_plane_metadata = metadata['Ophys']['ImagingPlane'][0]
+                ps_metadata = metadata['Ophys']['ImageSegmentation']['plane_segmentations'][0]
+                num_rois = segext_obj.get_num_rois()
+                sampling_frequency = segext_obj.get_sampling_frequency()
+
                 # Device:
-                if metadata['Ophys']['Device'][0]['name'] not in nwbfile.devices:
-                    nwbfile.create_device(**metadata['Ophys']['Device'][0])
+                if device_metadata['name'] not in devices:
+                    nwbfile.create_device(**device_metadata)
 
                 # ImageSegmentation:
                 image_segmentation_name = 'ImageSegmentation' if plane_no_loop == 0 else f'ImageSegmentation_Plane{plane_no_loop}'
-                if image_segmentation_name not in ophys.data_interfaces:
+                image_segmentation = data_interfaces.get(image_segmentation_name)
+                if image_segmentation is None:
                     image_segmentation = ImageSegmentation(name=image_segmentation_name)
                     ophys.add_data_interface(image_segmentation)
-                else:
-                    image_segmentation = ophys.data_interfaces.get(image_segmentation_name)
+                plane_segmentations = image_segmentation.plane_segmentations
+                ps_name = ps_metadata['name']
 
                 # OpticalChannel:
-                optical_channels = [OpticalChannel(**i) for i in
-                                    metadata['Ophys']['ImagingPlane'][0]['optical_channel']]
+                optical_channels = [OpticalChannel(**i) for i in imaging_plane_metadata['optical_channel']]
 
                 # ImagingPlane:
                 image_plane_name = 'ImagingPlane' if plane_no_loop == 0 else f'ImagePlane_{plane_no_loop}'
-                if image_plane_name not in nwbfile.imaging_planes.keys():
+                imaging_plane = imaging_planes.get(image_plane_name)
+                if imaging_plane is None:
                     input_kwargs = dict(
                         name=image_plane_name,
                         device=nwbfile.get_device(metadata_base_common['Ophys']['Device'][0]['name']),
                     )
-                    metadata['Ophys']['ImagingPlane'][0]['optical_channel'] = optical_channels
-                    input_kwargs.update(**metadata['Ophys']['ImagingPlane'][0])
+                    imaging_plane_metadata['optical_channel'] = optical_channels
+                    input_kwargs.update(**imaging_plane_metadata)
                     if 'imaging_rate' in input_kwargs:
                         input_kwargs['imaging_rate'] = float(input_kwargs['imaging_rate'])
                     imaging_plane = nwbfile.create_imaging_plane(**input_kwargs)
-                else:
-                    imaging_plane = nwbfile.imaging_planes[image_plane_name]
 
                 # PlaneSegmentation:
                 input_kwargs = dict(
                     description='output from segmenting imaging plane',
                     imaging_plane=imaging_plane
                 )
-                ps_metadata = metadata['Ophys']['ImageSegmentation']['plane_segmentations'][0]
-                if ps_metadata['name'] not in image_segmentation.plane_segmentations:
-                    input_kwargs.update(**ps_metadata)
+                ps = plane_segmentations.get(ps_name)
+                if ps is None:
+                    # ROI add: every column is built at once from full arrays
+                    image_masks = np.ascontiguousarray(np.moveaxis(segext_obj.get_roi_image_masks(), -1, 0))
+                    if image_masks.dtype != np.uint8 and np.array_equal(image_masks, image_masks.astype(bool)):
+                        # binary masks are stored as uint8 rather than floats
+                        image_masks = image_masks.astype(np.uint8)
+                    roi_ids = segext_obj.get_roi_ids()
+                    accepted_list = segext_obj.get_accepted_list()
+                    accepted_set = set() if accepted_list is None else set(accepted_list)
+                    rejected_list = segext_obj.get_rejected_list()
+                    rejected_set = set() if rejected_list is None else set(rejected_list)
+                    accepted_ids = np.fromiter((k in accepted_set for k in roi_ids), dtype=np.int8, count=num_rois)
+                    rejected_ids = np.fromiter((k in rejected_set for k in roi_ids), dtype=np.int8, count=num_rois)
+                    roi_locations = np.array(segext_obj.get_roi_locations()).T
+                    rois_per_chunk = max(1, min(num_rois, 1024))
+                    columns = [
+                        VectorData(name='image_mask', description='Image masks for each ROI',
+                                   data=_get_image_mask_dataio(image_masks)),
+                        VectorData(name='RoiCentroid', description='x,y location of centroid of the roi in image_mask',
+                                   data=H5DataIO(roi_locations, chunks=(rois_per_chunk, 2))),
+                        VectorData(name='Accepted',
+                                   description='1 if ROi was accepted or 0 if rejected as a cell during segmentation operation',
+                                   data=H5DataIO(accepted_ids, chunks=(rois_per_chunk,))),
+                        VectorData(name='Rejected',
+                                   description='1 if ROi was rejected or 0 if accepted as a cell during segmentation operation',
+                                   data=H5DataIO(rejected_ids, chunks=(rois_per_chunk,)))
+                    ]
+                    input_kwargs.update(**ps_metadata, id=list(roi_ids), columns=columns)
                     ps = image_segmentation.create_plane_segmentation(**input_kwargs)
-                    ps_exist = False
-                else:
-                    ps = image_segmentation.get_plane_segmentation(ps_metadata['name'])
-                    ps_exist = True
-
-                # ROI add:
-                image_masks = segext_obj.get_roi_image_masks()
-                roi_ids = segext_obj.get_roi_ids()
-                accepted_list = segext_obj.get_accepted_list()
-                accepted_list = [] if accepted_list is None else accepted_list
-                rejected_list = segext_obj.get_rejected_list()
-                rejected_list = [] if rejected_list is None else rejected_list
-                accepted_ids = [1 if k in accepted_list else 0 for k in roi_ids]
-                rejected_ids = [1 if k in rejected_list else 0 for k in roi_ids]
-                roi_locations = np.array(segext_obj.get_roi_locations()).T
-                if not ps_exist:
-                    ps.add_column(name='RoiCentroid',
-                                  description='x,y location of centroid of the roi in image_mask')
-                    ps.add_column(name='Accepted',
-                                  description='1 if ROi was accepted or 0 if rejected as a cell during segmentation operation')
-                    ps.add_column(name='Rejected',
-                                  description='1 if ROi was rejected or 0 if accepted as a cell during segmentation operation')
-                    for num, row in enumerate(roi_ids):
-                        ps.add_roi(id=row, image_mask=image_masks[:, :, num],
-                                   RoiCentroid=roi_locations[num, :],
-                                   Accepted=accepted_ids[num], Rejected=rejected_ids[num])
 
                 # Fluorescence Traces:
-                if 'Flourescence' not in ophys.data_interfaces:
-                    fluorescence = Fluorescence()
-                    ophys.add_data_interface(fluorescence)
-                else:
-                    fluorescence = ophys.data_interfaces['Fluorescence']
-                roi_response_dict = segext_obj.get_traces_dict()
+                fluorescence = data_interfaces.get('Fluorescence')
+                roi_response_series = dict() if fluorescence is None else fluorescence.roi_response_series
                 roi_table_region = ps.create_roi_table_region(description=f'region for Imaging plane{plane_no_loop}',
-                                                              region=list(range(segext_obj.get_num_rois())))
-                rate = np.float(
-                    'NaN') if segext_obj.get_sampling_frequency() is None else segext_obj.get_sampling_frequency()
-                for i, j in roi_response_dict.items():
-                    data = getattr(segext_obj, f'_roi_response_{i}')
-                    if data is not None:
-                        data = np.asarray(data)
-                        trace_name = 'RoiResponseSeries' if i == 'raw' else i.capitalize()
-                        trace_name = trace_name if plane_no_loop == 0 else trace_name + f'_Plane{plane_no_loop}'
-                        input_kwargs = dict(name=trace_name, data=data.T, rois=roi_table_region, rate=rate, unit='n.a.')
-                        if trace_name not in fluorescence.roi_response_series:
-                            fluorescence.create_roi_response_series(**input_kwargs)
+                                                              region=list(range(num_rois)))
+                rate = np.nan if sampling_frequency is None else sampling_frequency
+                # all new series are collected and handed to Fluorescence at once; traces are taken
+                # as stored rather than from get_traces_dict(), which copies every one of them:
+                roi_response_series_list = []
+                for i, data in segext_obj._get_roi_response_dict().items():
+                    trace_name = 'RoiResponseSeries' if i == 'raw' else i.capitalize()
+                    trace_name = trace_name if plane_no_loop == 0 else trace_name + f'_Plane{plane_no_loop}'
+                    if data is not None and trace_name not in roi_response_series:
+                        if isinstance(data, DatasetView):
+                            # undo the lazy transpose and read the stored (time, rois) layout as is:
+                            data = np.asarray(data.lazy_transpose())
+                        else:
+                            data = np.ascontiguousarray(np.asarray(data).T)
+                        # HDF5 chunks of ~1MB along the time axis
+                        frames_per_chunk = max(1, 1000000 // max(1, data.shape[1] * data.dtype.itemsize))
+                        chunks = (max(1, min(frames_per_chunk, data.shape[0])), data.shape[1])
+                        roi_response_series_list.append(
+                            RoiResponseSeries(name=trace_name, data=H5DataIO(data, chunks=chunks),
+                                              rois=roi_table_region, rate=rate, unit='n.a.'))
+                if fluorescence is None:
+                    ophys.add_data_interface(Fluorescence(roi_response_series=roi_response_series_list))
+                elif roi_response_series_list:
+                    fluorescence.add_roi_response_series(roi_response_series_list)
 
                 # create Two Photon Series:
                 if 'TwoPhotonSeries' not in nwbfile.acquisition:
@@ -766,7 +973,7 @@ class NwbSegmentationExtractor(SegmentationExtractor):
                 images_dict = segext_obj.get_images_dict()
                 if any([image is not None for image in images_dict.values()]):
                     images_name = 'SegmentationImages' if plane_no_loop == 0 else f'SegmentationImages_Plane{plane_no_loop}'
-                    if images_name not in ophys.data_interfaces:
+                    if images_name not in data_interfaces:
                         images = Images(images_name)
                         for img_name, img_no in images_dict.items():
                             if img_no is not None:
@@ -776,6 +983,6 @@ class NwbSegmentationExtractor(SegmentationExtractor):
             # saving NWB file:
             io.write(nwbfile)
 
-        # test read
-        with NWBHDF5IO(str(save_path), 'r') as io:
-            io.read()
+        if verify_after_write:
+            with NWBHDF5IO(str(save_path), 'r') as io:
+                io.read()
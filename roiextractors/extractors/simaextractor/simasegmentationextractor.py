@@ -110,8 +110,7 @@ class SimaSegmentationExtractor(SegmentationExtractor):
             self.sima_segmentation_label = list(_sima_rois.keys())[0]
         else:
             raise Exception('no ROIs found in the sima file')
-        image_masks_ = [np.squeeze(np.array(roi_dat)).T for roi_dat in _sima_rois_data]
-        return np.array(image_masks_).T
+        return np.stack([np.squeeze(np.array(roi_dat)) for roi_dat in _sima_rois_data], axis=-1)
 
     def _trace_extractor_read(self):
         for channel_now in self._channel_names:
@@ -138,14 +137,14 @@ class SimaSegmentationExtractor(SegmentationExtractor):
         return extracted_signals
 
     def _summary_image_read(self):
-        summary_image = np.squeeze(self._dataset_file.time_averages[0]).T
-        return np.array(summary_image).T
+        return np.ascontiguousarray(np.squeeze(self._dataset_file.time_averages[0]))
 
     def get_accepted_list(self):
         return list(range(self.get_num_rois()))
 
     def get_rejected_list(self):
-        return [a for a in range(self.get_num_rois()) if a not in set(self.get_accepted_list())]
+        accepted_set = set(self.get_accepted_list())
+        return [a for a in range(self.get_num_rois()) if a not in accepted_set]
 
     @staticmethod
     def write_segmentation(segmentation_object, savepath):
@@ -33,6 +33,7 @@ class Suite2pSegmentationExtractor(SegmentationExtractor):
         self.plane_no = plane_no
         self.file_path = file_path
         self.stat = self._load_npy('stat.npy')
+        self._pixel_masks, self._pixel_mask_offsets = self._pixel_masks_read()
         self._roi_response_raw = self._load_npy('F.npy', mmap_mode='r')
         self._roi_response_neuropil = self._load_npy('Fneu.npy', mmap_mode='r')
         self._roi_response_deconvolved = self._load_npy('spks.npy', mmap_mode='r')
@@ -41,7 +42,8 @@ class Suite2pSegmentationExtractor(SegmentationExtractor):
         self._channel_names = [f'OpticalChannel{i}' for i in range(self.ops['nchannels'])]
         self._sampling_frequency = self.ops['fs'] * [2 if self.combined else 1][0]
         self._raw_movie_file_location = self.ops['filelist'][0]
-        self.image_masks = self.get_roi_image_masks()
+        self.image_masks = _image_mask_extractor(self.get_roi_pixel_masks(), list(range(self.get_num_rois())),
+                                                 self.get_image_size())
         self._image_correlation = self._summary_image_read('Vcorr')
         self._image_mean = self._summary_image_read('meanImg')
 
@@ -49,6 +51,16 @@ class Suite2pSegmentationExtractor(SegmentationExtractor):
         fpath = os.path.join(self.file_path, f'Plane{self.plane_no}', filename)
         return np.load(fpath, mmap_mode=mmap_mode)
 
+    def _pixel_masks_read(self):
+        # pixel masks of all the rois in one array, roi after roi, with the row offset of every roi:
+        if len(self.stat) == 0:
+            return np.empty((0, 3)), np.array([0])
+        num_pixels = [len(roi_stat['lam']) for roi_stat in self.stat]
+        offsets = np.concatenate([[0], np.cumsum(num_pixels)])
+        pixel_masks = np.column_stack([np.concatenate([roi_stat[key] for roi_stat in self.stat])
+                                       for key in ['ypix', 'xpix', 'lam']])
+        return pixel_masks, offsets
+
     def get_accepted_list(self):
         return np.where(self.iscell[:, 0] == 1)[0]
 
@@ -88,17 +100,16 @@ class Suite2pSegmentationExtractor(SegmentationExtractor):
         if not save_path.is_dir():
             save_path.mkdir(parents=True)
 
-        # saving traces:
-        if segmentation_object.get_traces(name='raw') is not None:
-            np.save(save_path / 'F.npy', segmentation_object.get_traces(name='raw'))
-        if segmentation_object.get_traces(name='neuropil') is not None:
-            np.save(save_path / 'Fneu.npy', segmentation_object.get_traces(name='neuropil'))
-        if segmentation_object.get_traces(name='deconvolved') is not None:
-            np.save(save_path / 'spks.npy', segmentation_object.get_traces(name='deconvolved'))
+        # saving traces, each fetched once as stored:
+        roi_response_dict = segmentation_object._get_roi_response_dict()
+        for trace_name, file_name in [('raw', 'F.npy'), ('neuropil', 'Fneu.npy'), ('deconvolved', 'spks.npy')]:
+            if roi_response_dict[trace_name] is not None:
+                np.save(save_path / file_name, roi_response_dict[trace_name])
         # save stat
-        stat = np.zeros(segmentation_object.no_rois, 'O')
+        num_rois = segmentation_object.get_num_rois()
+        stat = np.empty(num_rois, 'O')
         roi_locs = segmentation_object.roi_locations.T
-        pixel_masks = segmentation_object.get_roi_pixel_masks(roi_ids=range(segmentation_object.no_rois))
+        pixel_masks = segmentation_object.get_roi_pixel_masks(roi_ids=range(num_rois))
         for no, i in enumerate(stat):
             stat[no] = {'med': roi_locs[no, :].tolist(),
                         'ypix': pixel_masks[no][:, 0],
@@ -106,7 +117,7 @@ class Suite2pSegmentationExtractor(SegmentationExtractor):
                         'lam': pixel_masks[no][:, 2]}
         np.save(save_path / 'stat.npy', stat)
         # saving iscell
-        iscell = np.ones([segmentation_object.no_rois, 2])
+        iscell = np.ones((num_rois, 2))
         iscell[segmentation_object.get_rejected_list(), 0] = 0
         np.save(save_path / 'iscell.npy', iscell)
         # saving ops
@@ -126,29 +137,15 @@ class Suite2pSegmentationExtractor(SegmentationExtractor):
     def get_roi_ids(self):
         return list(range(self.get_num_rois()))
 
-    def get_roi_image_masks(self, roi_ids=None):
-        if roi_ids is None:
-            roi_idx_ = range(self.get_num_rois())
-        else:
-            roi_idx = [np.where(np.array(i) == self.get_roi_ids())[0] for i in roi_ids]
-            ele = [i for i, j in enumerate(roi_idx) if j.size == 0]
-            roi_idx_ = [j[0] for i, j in enumerate(roi_idx) if i not in ele]
-        return _image_mask_extractor(self.get_roi_pixel_masks(roi_ids=roi_idx_), list(range(len(roi_idx_))),
-                                     self.get_image_size())
-
     def get_roi_pixel_masks(self, roi_ids=None):
-        pixel_mask = []
-        for i in range(self.get_num_rois()):
-            pixel_mask.append(np.vstack([self.stat[i]['ypix'],
-                                         self.stat[i]['xpix'],
-                                         self.stat[i]['lam']]).T)
         if roi_ids is None:
             roi_idx_ = range(self.get_num_rois())
         else:
             roi_idx = [np.where(np.array(i) == self.get_roi_ids())[0] for i in roi_ids]
             ele = [i for i, j in enumerate(roi_idx) if j.size == 0]
             roi_idx_ = [j[0] for i, j in enumerate(roi_idx) if i not in ele]
-        return [pixel_mask[i] for i in roi_idx_]
+        offsets = self._pixel_mask_offsets
+        return [self._pixel_masks[offsets[i]:offsets[i + 1]] for i in roi_idx_]
 
     def get_image_size(self):
         return [self.ops['Lx'], self.ops['Ly']]
@@ -58,10 +58,17 @@ class SegmentationExtractor(ABC, BaseExtractor):
 
     @property
     def roi_locations(self):
-        roi_location = np.ndarray([2, self.get_num_rois()], dtype='int')
-        for i in range(self.get_num_rois()):
-            temp = np.where(self.image_masks[:, :, i] == np.amax(self.image_masks[:, :, i]))
-            roi_location[:, i] = np.array([np.median(temp[0]), np.median(temp[1])]).T
+        num_rois = self.get_num_rois()
+        image_masks = np.asarray(self.image_masks)[:, :, :num_rois]
+        roi_location = np.empty((2, num_rois), dtype=np.int64)
+        if num_rois == 0:
+            return roi_location
+        # pixels at the maximum of every roi mask, grouped by roi:
+        is_max = np.moveaxis(image_masks == image_masks.max(axis=(0, 1)), -1, 0)
+        roi_idx, x_locs, y_locs = np.nonzero(is_max)
+        roi_starts = np.searchsorted(roi_idx, np.arange(1, num_rois))
+        roi_location[0, :] = [np.median(x) for x in np.split(x_locs, roi_starts)]
+        roi_location[1, :] = [np.median(y) for y in np.split(y_locs, roi_starts)]
         return roi_location
 
     def get_num_frames(self) -> int:
@@ -72,9 +79,9 @@ class SegmentationExtractor(ABC, BaseExtractor):
         num_of_frames: int
             Number of frames in the recording (duration of recording).
         """
-        for trace in self.get_traces_dict().values():
-            if len(trace.shape) > 0:
-                return trace.shape[1]
+        for trace in self._get_roi_response_dict().values():
+            if len(np.shape(trace)) > 0:
+                return np.shape(trace)[1]
 
     def get_roi_locations(self, roi_ids=None) -> np.array:
         """
@@ -130,6 +137,9 @@ class SegmentationExtractor(ABC, BaseExtractor):
             roi_idx = [np.where(np.array(i) == self.get_roi_ids())[0] for i in roi_ids]
             ele = [i for i, j in enumerate(roi_idx) if j.size == 0]
             roi_idx_ = [j[0] for i, j in enumerate(roi_idx) if i not in ele]
+        if isinstance(self.image_masks, np.ndarray):
+            # select from the stored masks directly rather than copying all of them first
+            return self.image_masks[:, :, roi_idx_]
         return np.array(self.image_masks)[:, :, roi_idx_]
 
     def get_roi_pixel_masks(self, roi_ids=None) -> np.array:
@@ -171,17 +181,31 @@ class SegmentationExtractor(ABC, BaseExtractor):
         traces: array_like
             2-D array (ROI x timepoints)
         """
-        if name not in self.get_traces_dict():
-            raise ValueError(f'traces for {name} not found, enter one of {list(self.get_traces_dict().keys())}')
+        roi_response_dict = self._get_roi_response_dict()
+        if name not in roi_response_dict:
+            raise ValueError(f'traces for {name} not found, enter one of {list(roi_response_dict.keys())}')
         if roi_ids is None:
             roi_idx_ = range(self.get_num_rois())
         else:
             roi_idx = [np.where(np.array(i) == self.get_roi_ids())[0] for i in roi_ids]
             ele = [i for i, j in enumerate(roi_idx) if j.size == 0]
             roi_idx_ = [j[0] for i, j in enumerate(roi_idx) if i not in ele]
-        traces = self.get_traces_dict().get(name)
+        traces = roi_response_dict[name]
         return np.array([traces[int(i), start_frame:end_frame] for i in roi_idx_])
 
+    def _get_roi_response_dict(self):
+        """
+        Traces as stored by the extractor (in memory, memmapped or lazy), without copying them.
+        Returns
+        -------
+        _roi_response_dict: dict
+            dictionary with key as the name of the RoiResponseSeries and value None if not available
+        """
+        return dict(raw=self._roi_response_raw,
+                    dff=self._roi_response_dff,
+                    neuropil=self._roi_response_neuropil,
+                    deconvolved=self._roi_response_deconvolved)
+
     def get_traces_dict(self):
         """
         Returns traces as a dictionary with key as the name of the ROiResponseSeries
@@ -191,10 +215,7 @@ class SegmentationExtractor(ABC, BaseExtractor):
             dictionary with key, values representing different types of RoiResponseSeries
             Flourescence, Neuropil, Deconvolved, Background etc
         """
-        return deepcopy(dict(raw=np.array(self._roi_response_raw),
-                             dff=np.array(self._roi_response_dff),
-                             neuropil=np.array(self._roi_response_neuropil),
-                             deconvolved=np.array(self._roi_response_deconvolved)))
+        return deepcopy({trace_name: np.array(trace) for trace_name, trace in self._get_roi_response_dict().items()})
 
     def get_images_dict(self):
         """
@@ -231,7 +252,7 @@ class SegmentationExtractor(ABC, BaseExtractor):
         samp_freq: float
             Sampling frequency of the recordings in Hz.
         """
-        return self._sampling_frequency.astype(np.float)
+        return self._sampling_frequency.astype(float)
 
     def get_num_rois(self):
         """Returns total number of Regions of Interest in the acquired images.
@@ -241,9 +262,9 @@ class SegmentationExtractor(ABC, BaseExtractor):
         no_rois: int
             integer number of ROIs extracted.
         """
-        for trace in self.get_traces_dict().values():
-            if len(trace.shape) > 0:
-                return trace.shape[0]
+        for trace in self._get_roi_response_dict().values():
+            if len(np.shape(trace)) > 0:
+                return np.shape(trace)[0]
 
     def get_channel_names(self):
         """
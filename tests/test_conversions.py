@@ -15,7 +15,7 @@ class TestNwbConversions(unittest.TestCase):
         path = resp[0]['path']
         seg_ex = CaimanSegmentationExtractor(path)
 
-        NwbSegmentationExtractor.write_segmentation(seg_ex, 'caiman_test.nwb')
+        NwbSegmentationExtractor.write_segmentation(seg_ex, 'caiman_test.nwb', verify_after_write=True)
 
 
 if __name__ == '__main__':
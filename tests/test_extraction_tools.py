@@ -0,0 +1,44 @@
+import unittest
+
+from roiextractors.extraction_tools import dict_recursive_update
+
+
+class TestDictRecursiveUpdate(unittest.TestCase):
+
+    def test_nested_dict_inside_list(self):
+        base = dict(Ophys=dict(ImagingPlane=[dict(name='ImagingPlane', description='no description',
+                                                  optical_channel=[dict(name='OpticalChannel')])]))
+        input_ = dict(Ophys=dict(ImagingPlane=[dict(description='plane description', indicator='GCaMP6s',
+                                                    optical_channel=[dict(emission_lambda=500.)])]))
+        dict_recursive_update(base, input_)
+        self.assertEqual(base, dict(Ophys=dict(ImagingPlane=[dict(
+            name='ImagingPlane', description='plane description', indicator='GCaMP6s',
+            optical_channel=[dict(name='OpticalChannel', emission_lambda=500.)])])))
+
+    def test_extra_list_items_appended(self):
+        base = dict(Device=[dict(name='Microscope')])
+        input_ = dict(Device=[dict(description='first device'), dict(name='Microscope2')])
+        dict_recursive_update(base, input_)
+        self.assertEqual(base, dict(Device=[dict(name='Microscope', description='first device'),
+                                            dict(name='Microscope2')]))
+
+    def test_non_dict_list_items_overwritten(self):
+        base = dict(values=[1, 2, 3])
+        dict_recursive_update(base, dict(values=[10]))
+        self.assertEqual(base, dict(values=[10, 2, 3]))
+
+    def test_scalar_overwrite(self):
+        base = dict(NWBFile=dict(session_description='no description', identifier='abc'), rate=30.)
+        input_ = dict(NWBFile=dict(session_description='my session'), rate=15., new_key='value')
+        dict_recursive_update(base, input_)
+        self.assertEqual(base, dict(NWBFile=dict(session_description='my session', identifier='abc'),
+                                    rate=15., new_key='value'))
+
+    def test_updates_in_place(self):
+        base = dict(a=dict(b=1))
+        self.assertIs(dict_recursive_update(base, dict(a=dict(c=2))), base)
+        self.assertEqual(base, dict(a=dict(b=1, c=2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+import h5py
+import numpy as np
+from numpy.testing import assert_array_equal
+from pynwb import NWBHDF5IO, NWBFile
+from pynwb.ophys import ImageSegmentation, Fluorescence, OpticalChannel
+
+from roiextractors import NwbImagingExtractor, NwbSegmentationExtractor, NumpyImagingExtractor, \
+    NumpySegmentationExtractor
+from roiextractors.extractors.nwbextractors.nwbextractors import _read_frames_by_chunk
+
+
+class TestReadFramesByChunk(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.data = np.random.randn(23, 4, 5).astype('float32')
+        self.file = h5py.File(self.test_dir / 'frames.h5', 'w')
+        self.dataset = self.file.create_dataset('data', data=self.data, chunks=(4, 4, 5))
+
+    def tearDown(self):
+        self.file.close()
+        shutil.rmtree(self.test_dir)
+
+    def _check(self, frame_idxs):
+        frame_idxs = np.array(frame_idxs, dtype=int)
+        frames = _read_frames_by_chunk(self.dataset, frame_idxs)
+        assert_array_equal(frames, self.dataset[...][frame_idxs])
+        self.assertEqual(frames.shape, (len(frame_idxs), 4, 5))
+
+    def test_unsorted(self):
+        self._check([17, 2, 9, 3, 22, 0])
+
+    def test_duplicates(self):
+        self._check([5, 5, 1, 18, 1, 5])
+
+    def test_single(self):
+        self._check([13])
+
+    def test_empty(self):
+        self._check([])
+
+    def test_groups_spanning_chunks(self):
+        self._check([3, 4, 7, 8, 11, 12, 19, 20])
+
+
+class TestNwbSegmentationAcceptedRejected(unittest.TestCase):
+    accepted = [1, 0, 1, 1, 0]
+    rejected = [0, 1, 0, 0, 0]
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_nwbfile(self, accepted=None, rejected=None):
+        num_rois = len(self.accepted)
+        nwbfile = NWBFile(session_description='no description', identifier='test',
+                          session_start_time=datetime.now().astimezone())
+        device = nwbfile.create_device(name='Microscope')
+        imaging_plane = nwbfile.create_imaging_plane(
+            name='ImagingPlane', optical_channel=OpticalChannel('OpticalChannel', 'no description', 500.),
+            description='no description', device=device, excitation_lambda=600., imaging_rate=30.,
+            indicator='unknown', location='unknown')
+        ophys = nwbfile.create_processing_module('ophys', 'contains optical physiology processed data')
+        image_segmentation = ImageSegmentation()
+        ophys.add(image_segmentation)
+        ps = image_segmentation.create_plane_segmentation(description='no description',
+                                                          imaging_plane=imaging_plane,
+                                                          name='PlaneSegmentation')
+        for roi_no in range(num_rois):
+            image_mask = np.zeros((8, 8))
+            image_mask[roi_no, roi_no] = 1
+            ps.add_roi(image_mask=image_mask)
+        if accepted is not None:
+            ps.add_column(name='Accepted', description='accepted', data=accepted)
+        if rejected is not None:
+            ps.add_column(name='Rejected', description='rejected', data=rejected)
+        fluorescence = Fluorescence()
+        ophys.add(fluorescence)
+        fluorescence.create_roi_response_series(
+            name='RoiResponseSeries', data=np.random.randn(10, num_rois), unit='n.a.', rate=30.,
+            rois=ps.create_roi_table_region(description='all rois', region=list(range(num_rois))))
+        file_path = self.test_dir / 'segmentation.nwb'
+        with NWBHDF5IO(str(file_path), 'w') as io:
+            io.write(nwbfile)
+        return NwbSegmentationExtractor(file_path)
+
+    def test_with_rejected_column(self):
+        seg = self._write_nwbfile(accepted=self.accepted, rejected=self.rejected)
+        self.assertEqual(seg.get_accepted_list(), [0, 2, 3])
+        self.assertEqual(seg.get_rejected_list(), [1])
+
+    def test_without_rejected_column(self):
+        seg = self._write_nwbfile(accepted=self.accepted)
+        self.assertEqual(seg.get_accepted_list(), [0, 2, 3])
+        self.assertEqual(seg.get_rejected_list(), [1, 4])
+
+    def test_without_accepted_and_rejected_columns(self):
+        seg = self._write_nwbfile()
+        self.assertEqual(seg.get_accepted_list(), [0, 1, 2, 3, 4])
+        self.assertEqual(seg.get_rejected_list(), [])
+
+    def test_cached_lists_are_copies(self):
+        seg = self._write_nwbfile(accepted=self.accepted, rejected=self.rejected)
+        accepted_list = seg.get_accepted_list()
+        rejected_list = seg.get_rejected_list()
+        accepted_list.append(100)
+        rejected_list.clear()
+        self.assertEqual(seg.get_accepted_list(), [0, 2, 3])
+        self.assertEqual(seg.get_rejected_list(), [1])
+        self.assertIsNot(seg.get_accepted_list(), seg.get_accepted_list())
+
+
+class TestNwbImagingWriteRead(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _check_round_trip(self, num_frames, num_chunks):
+        video = np.random.randn(num_frames, 6, 7).astype('float32')
+        imaging = NumpyImagingExtractor(timeseries=video, sampling_frequency=30.)
+        file_path = self.test_dir / 'imaging.nwb'
+        NwbImagingExtractor.write_imaging(imaging, save_path=file_path, num_chunks=num_chunks)
+        nwb_imaging = NwbImagingExtractor(file_path)
+        self.assertEqual(nwb_imaging.get_num_frames(), num_frames)
+        assert_array_equal(nwb_imaging.get_video(), imaging.get_video())
+
+    def test_single_frame_last_slab(self):
+        self._check_round_trip(num_frames=37, num_chunks=10)
+
+    def test_fewer_frames_than_chunks(self):
+        self._check_round_trip(num_frames=6, num_chunks=10)
+
+
+class TestNwbSegmentationWriteRead(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        num_rois, num_frames = 4, 20
+        image_masks = np.zeros((10, 12, num_rois))
+        for roi_no in range(num_rois):
+            image_masks[2 * roi_no:2 * roi_no + 2, 3 * roi_no:3 * roi_no + 3, roi_no] = 1
+        self.segmentation = NumpySegmentationExtractor(
+            image_masks=image_masks, raw=np.random.randn(num_rois, num_frames),
+            deconvolved=np.random.randn(num_rois, num_frames), neuropil=np.random.randn(num_rois, num_frames),
+            accepted_lst=[0, 2, 3], rejected_list=[1], roi_ids=list(range(num_rois)),
+            sampling_frequency=np.float64(30.), channel_names=['OpticalChannel'])
+        self.file_path = self.test_dir / 'segmentation.nwb'
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _check_nwbfile(self):
+        nwb_segmentation = NwbSegmentationExtractor(self.file_path)
+        self.assertEqual(nwb_segmentation.get_num_rois(), self.segmentation.get_num_rois())
+        assert_array_equal(nwb_segmentation.get_roi_image_masks(), self.segmentation.get_roi_image_masks())
+        self.assertEqual(nwb_segmentation.get_roi_image_masks().dtype, np.float64)
+        assert_array_equal(nwb_segmentation.get_roi_locations(), self.segmentation.get_roi_locations())
+        self.assertEqual(nwb_segmentation.get_accepted_list(), [0, 2, 3])
+        self.assertEqual(nwb_segmentation.get_rejected_list(), [1])
+        for trace_name in ['raw', 'deconvolved', 'neuropil']:
+            assert_array_equal(nwb_segmentation.get_traces(name=trace_name),
+                               self.segmentation.get_traces(name=trace_name))
+        del nwb_segmentation
+
+    def test_write_read(self):
+        NwbSegmentationExtractor.write_segmentation(self.segmentation, self.file_path)
+        self._check_nwbfile()
+
+    def test_write_existing_without_overwrite(self):
+        NwbSegmentationExtractor.write_segmentation(self.segmentation, self.file_path)
+        NwbSegmentationExtractor.write_segmentation(self.segmentation, self.file_path, overwrite=False)
+        self._check_nwbfile()
+
+
+if __name__ == '__main__':
+    unittest.main()